@@ -47,16 +47,19 @@ Keys File Format:
 
 import argparse
 import datetime
+import functools
 import os
-import re
 import secrets
 import stat
+import string
 import sys
 import tempfile
+from collections.abc import Iterator
 
 # --- Constants ---
 
-KEY_ID_PATTERN = re.compile(r"^[a-zA-Z0-9_-]{1,64}$")
+KEY_ID_MAX_LENGTH = 64
+KEY_ID_CHARS = frozenset(string.ascii_letters + string.digits + "-_")
 KEY_PREFIX = "sk-"
 
 
@@ -77,7 +80,7 @@ def validate_key_id(key_id: str) -> bool:
 
     Rules: alphanumeric, hyphens, underscores. Length 1-64 characters.
     """
-    return bool(KEY_ID_PATTERN.match(key_id))
+    return 0 < len(key_id) <= KEY_ID_MAX_LENGTH and KEY_ID_CHARS.issuperset(key_id)
 
 
 def generate_api_key() -> str:
@@ -90,7 +93,8 @@ def generate_api_key() -> str:
     return KEY_PREFIX + secrets.token_urlsafe(32)
 
 
-RELATIVE_TIME_PATTERN = re.compile(r"^(\d+)([dhm])$")
+# Relative expiration suffix -> datetime.timedelta keyword
+RELATIVE_TIME_UNITS = {"d": "days", "h": "hours", "m": "minutes"}
 
 
 def parse_expiration(value: str) -> str:
@@ -110,29 +114,23 @@ def parse_expiration(value: str) -> str:
     Raises:
         ValueError: If the value cannot be parsed.
     """
-    # Try relative format first (30d, 24h, 60m)
-    match = RELATIVE_TIME_PATTERN.match(value.strip())
-    if match:
-        amount = int(match.group(1))
-        unit = match.group(2)
-        now = datetime.datetime.now()
-        if unit == "d":
-            expires = now + datetime.timedelta(days=amount)
-        elif unit == "h":
-            expires = now + datetime.timedelta(hours=amount)
-        elif unit == "m":
-            expires = now + datetime.timedelta(minutes=amount)
-        else:
-            raise ValueError(f"Unknown time unit: {unit}")
-        return expires.isoformat()
+    text = value.strip()
+
+    # Try relative format first (30d, 24h, 60m): dispatch on the suffix character
+    amount, unit = text[:-1], text[-1:]
+    if unit in RELATIVE_TIME_UNITS and amount.isdecimal():
+        delta = datetime.timedelta(**{RELATIVE_TIME_UNITS[unit]: int(amount)})
+        return (datetime.datetime.now() + delta).isoformat()
 
     # Try ISO 8601 format
     try:
-        datetime.datetime.fromisoformat(value.strip())
-        return value.strip()
+        datetime.datetime.fromisoformat(text)
+        return text
     except ValueError:
+        # "30x" looks relative, so name the bad unit rather than only the format
+        hint = f"Unknown time unit: {unit}. " if amount.isdecimal() and unit.isalpha() else ""
         raise ValueError(
-            f"Invalid expiration format: '{value}'. "
+            f"Invalid expiration format: '{value}'. {hint}"
             "Use ISO 8601 (e.g. 2026-03-01T00:00:00) or relative (e.g. 30d, 24h, 60m)."
         )
 
@@ -158,12 +156,12 @@ def build_key_line(
     Returns:
         Formatted key line string.
     """
-    line = f"{key_id}:{api_key}"
-    if rate_limit or expiration:
-        line += f":{rate_limit}"
     if expiration:
-        line += f":{expiration}"
-    return line
+        # An expiration without a rate limit keeps the empty field: id:key::exp
+        return f"{key_id}:{api_key}:{rate_limit}:{expiration}"
+    if rate_limit:
+        return f"{key_id}:{api_key}:{rate_limit}"
+    return f"{key_id}:{api_key}"
 
 
 def parse_key_line(line: str) -> tuple[str, str, str, str]:
@@ -188,37 +186,86 @@ def parse_key_line(line: str) -> tuple[str, str, str, str]:
     return key_id, api_key, rate_limit, expiration
 
 
-def load_keys_file(file_path: str) -> list[tuple[str, str, str]]:
+def _read_text(file_path: str) -> str:
+    """Read a whole file with raw os.read calls and decode it as UTF-8.
+
+    Keys files are small, so one read sized from fstat usually drains the file
+    without the buffered text-IO stack in between. Reads continue until EOF in
+    case the file grew after the fstat.
     """
-    Load all lines from the keys file, preserving structure.
+    fd = os.open(file_path, os.O_RDONLY)
+    try:
+        size = os.fstat(fd).st_size
+        chunks = []
+        while True:
+            chunk = os.read(fd, max(size, 4096))
+            if not chunk:
+                break
+            chunks.append(chunk)
+    finally:
+        os.close(fd)
+    return b"".join(chunks).decode("utf-8")
+
+
+def _split_lines(text: str) -> list[str]:
+    """Split text into lines on universal newlines only, like a text-mode read.
+
+    Unlike str.splitlines(), form feeds, LINE SEPARATOR and similar characters
+    stay inside their line, so a commented-out key after one is still part of
+    the comment (as auth.py's loader sees it).
+    """
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    if lines[-1] == "":
+        lines.pop()
+    return lines
 
-    Returns a list of tuples: (line_type, key_id_or_empty, full_line)
-    - ("key", key_id, original_line) for valid key lines
-    - ("other", "", original_line) for comments, blanks, and invalid lines
+
+def _read_entries(file_path: str) -> list[tuple[str, str, str]]:
+    """
+    Classify each line of the keys file as (line_type, key_id_or_empty, full_line).
+
+    A key line is any non-comment line containing a colon. A missing file
+    gives an empty list.
     """
     entries: list[tuple[str, str, str]] = []
 
     if not os.path.exists(file_path):
         return entries
 
-    with open(file_path, "r") as f:
-        for line in f:
-            stripped = line.rstrip("\n")
-            trimmed = stripped.strip()
+    for line in _split_lines(_read_text(file_path)):
+        trimmed = line.strip()
+        if not trimmed or trimmed.startswith("#"):
+            entries.append(("other", "", line))
+            continue
+        key_id, sep, _ = trimmed.partition(":")
+        if sep:
+            entries.append(("key", key_id.rstrip(), line))
+        else:
+            entries.append(("other", "", line))
+
+    return entries
+
+
+def load_keys_file(file_path: str) -> list[tuple[str, str, str]]:
+    """
+    Load all lines from the keys file, preserving structure.
 
-            if not trimmed or trimmed.startswith("#"):
-                entries.append(("other", "", stripped))
-                continue
+    Returns a list of tuples: (line_type, key_id_or_empty, full_line)
+    - ("key", key_id, original_line) for valid key lines
+    - ("other", "", original_line) for comments, blanks, and invalid lines
+    """
+    return _read_entries(file_path)
 
-            if ":" not in trimmed:
-                entries.append(("other", "", stripped))
-                continue
 
-            parts = trimmed.split(":", 1)
-            key_id = parts[0].strip()
-            entries.append(("key", key_id, stripped))
+def iter_keys_file(file_path: str) -> Iterator[tuple[str, str]]:
+    """
+    Yield (key_id, line) for each key line in the keys file.
 
-    return entries
+    Comments, blanks and invalid lines are skipped. A missing file yields nothing.
+    """
+    for line_type, key_id, line in _read_entries(file_path):
+        if line_type == "key":
+            yield key_id, line
 
 
 def find_key_id(entries: list[tuple[str, str, str]], key_id: str) -> int:
@@ -242,15 +289,25 @@ def atomic_write(file_path: str, lines: list[str]) -> None:
     interrupted mid-write.
 
     Sets file permissions to 0o600 (owner read/write only).
+
+    The payload is written in one os.write() and fsynced once before the
+    rename; the parent directory is then fsynced so the rename itself is
+    durable.
     """
     dir_path = os.path.dirname(os.path.abspath(file_path))
     os.makedirs(dir_path, exist_ok=True)
 
+    payload = "".join(line + "\n" for line in lines).encode("utf-8")
+
     fd, tmp_path = tempfile.mkstemp(dir=dir_path, prefix=".keys_", suffix=".tmp")
     try:
-        with os.fdopen(fd, "w") as f:
-            for line in lines:
-                f.write(line + "\n")
+        try:
+            view = memoryview(payload)
+            while view:
+                view = view[os.write(fd, view) :]
+            os.fsync(fd)
+        finally:
+            os.close(fd)
         os.chmod(tmp_path, stat.S_IRUSR | stat.S_IWUSR)  # 0o600
         os.replace(tmp_path, file_path)
     except Exception:
@@ -261,6 +318,22 @@ def atomic_write(file_path: str, lines: list[str]) -> None:
             pass
         raise
 
+    _fsync_dir(dir_path)
+
+
+def _fsync_dir(dir_path: str) -> None:
+    """Best-effort fsync of a directory; not supported on every platform."""
+    try:
+        dir_fd = os.open(dir_path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
 
 def ensure_file_exists(file_path: str) -> None:
     """Create the keys file if it doesn't exist, with proper permissions."""
@@ -354,6 +427,20 @@ def cmd_generate(args: argparse.Namespace) -> int:
     return 0
 
 
+def _is_expired(expiration: str, now: datetime.datetime) -> bool:
+    """Return True if expiration is a timestamp at or before now.
+
+    Empty and unparseable values count as not expired, so such keys are
+    still listed as active.
+    """
+    if not expiration:
+        return False
+    try:
+        return now >= datetime.datetime.fromisoformat(expiration)
+    except ValueError:
+        return False
+
+
 def cmd_list(args: argparse.Namespace) -> int:
     """List all configured API keys (shows key_ids only, never key values)."""
     file_path = args.file
@@ -366,29 +453,38 @@ def cmd_list(args: argparse.Namespace) -> int:
         print("0 key(s) configured")
         return 0
 
-    entries = load_keys_file(file_path)
-    key_entries = [(key_id, line) for line_type, key_id, line in entries if line_type == "key"]
+    if args.quiet:
+        print(f"{sum(1 for _ in iter_keys_file(file_path))} key(s) configured")
+        return 0
 
-    if not args.quiet:
-        print(f"{'KEY_ID':<20} {'RATE_LIMIT':<12} {'EXPIRES':<22} {'STATUS'}")
-        for key_id, line in key_entries:
-            _, _, rate_limit, expiration = parse_key_line(line)
-            rate_display = rate_limit + "/min" if rate_limit else "default"
-            expire_display = expiration if expiration else "-"
-
-            # Determine status based on expiration
-            status = "active"
-            if expiration:
-                try:
-                    exp_dt = datetime.datetime.fromisoformat(expiration)
-                    if datetime.datetime.now() >= exp_dt:
-                        status = "expired"
-                except ValueError:
-                    pass
-
-            print(f"{key_id:<20} {rate_display:<12} {expire_display:<22} {status}")
-
-    print(f"{len(key_entries)} key(s) configured")
+    # Pass 1: parse every key line into per-column lists
+    key_ids: list[str] = []
+    rates: list[str] = []
+    expirations: list[str] = []
+    for key_id, line in iter_keys_file(file_path):
+        _, _, rate_limit, expiration = parse_key_line(line)
+        key_ids.append(key_id)
+        rates.append(rate_limit + "/min" if rate_limit else "default")
+        expirations.append(expiration)
+
+    # Status for the whole column at once, against a single clock reading
+    now = datetime.datetime.now()
+    statuses = ["expired" if _is_expired(e, now) else "active" for e in expirations]
+    expires = [e if e else "-" for e in expirations]
+
+    # Pass 2: size columns to their longest value (fixed widths are minimums)
+    id_w = max(20, max(map(len, key_ids), default=0))
+    rate_w = max(12, max(map(len, rates), default=0))
+    exp_w = max(22, max(map(len, expires), default=0))
+    rows = [f"{'KEY_ID':<{id_w}} {'RATE_LIMIT':<{rate_w}} {'EXPIRES':<{exp_w}} {'STATUS'}"]
+    rows.extend(
+        f"{key_id:<{id_w}} {rate_display:<{rate_w}} {expire_display:<{exp_w}} {status}"
+        for key_id, rate_display, expire_display, status in zip(key_ids, rates, expires, statuses)
+    )
+    rows.append(f"{len(key_ids)} key(s) configured")
+
+    # One write for the whole table rather than a print() per row
+    sys.stdout.write("\n".join(rows) + "\n")
     return 0
 
 
@@ -482,8 +578,13 @@ def cmd_rotate(args: argparse.Namespace) -> int:
 # --- CLI Setup ---
 
 
+@functools.lru_cache(maxsize=1)
 def build_parser() -> argparse.ArgumentParser:
-    """Build the argument parser for the key management CLI."""
+    """Build the argument parser for the key management CLI.
+
+    The result is cached and shared between callers; parse_args() does not
+    mutate it, so callers must not modify the returned parser either.
+    """
     parser = argparse.ArgumentParser(
         prog="key_mgmt",
         description="API Key Management CLI for llama-gguf-inference",
@@ -491,7 +592,7 @@ def build_parser() -> argparse.ArgumentParser:
 
     parser.add_argument(
         "--file",
-        default=get_default_keys_file(),
+        default=None,
         help="Path to API keys file (default: $AUTH_KEYS_FILE or $DATA_DIR/api_keys.txt)",
     )
     parser.add_argument(
@@ -543,15 +644,26 @@ def build_parser() -> argparse.ArgumentParser:
     return parser
 
 
-def main() -> int:
-    """Main entry point for the CLI."""
+def main(argv: list[str] | None = None) -> int:
+    """Main entry point for the CLI.
+
+    Args:
+        argv: Argument list to parse (defaults to sys.argv[1:]).
+
+    Returns:
+        Process exit code.
+    """
     parser = build_parser()
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     if not args.command:
         parser.print_help()
         return 1
 
+    # Resolved per call rather than as a parser default, since the parser is cached
+    if args.file is None:
+        args.file = get_default_keys_file()
+
     commands = {
         "generate": cmd_generate,
         "list": cmd_list,
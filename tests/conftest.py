@@ -1,12 +1,77 @@
 """Shared test fixtures for auth module tests."""
 
 import os
+import shutil
 import sys
+import tempfile
+from pathlib import Path
 
 import pytest
 
-# Add scripts/ to path so we can import auth module
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+# Add scripts/ to path (once) so test modules can import the scripts directly
+_SCRIPTS_DIR = str(Path(__file__).resolve().parent.parent / "scripts")
+if _SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, _SCRIPTS_DIR)
+
+_SHM_DIR = Path("/dev/shm")
+_shm_basetemp_key = pytest.StashKey[str]()
+
+
+def pytest_addoption(parser):
+    """Register the --stress flag that enables @pytest.mark.stress tests."""
+    parser.addoption(
+        "--stress",
+        action="store_true",
+        default=False,
+        help="run stress tests (large sample sizes) that are skipped by default",
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip stress-marked tests unless --stress; pin serial tests to one xdist worker."""
+    run_stress = config.getoption("--stress")
+    has_xdist = config.pluginmanager.hasplugin("xdist")
+    skip_stress = pytest.mark.skip(reason="stress test; run with --stress")
+    for item in items:
+        if "stress" in item.keywords and not run_stress:
+            item.add_marker(skip_stress)
+        if has_xdist and "serial" in item.keywords:
+            # Honoured by pytest-xdist with --dist=loadgroup
+            item.add_marker(pytest.mark.xdist_group("serial"))
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    """Opt-in: keep tmp_path directories on tmpfs (/dev/shm) when PYTEST_TMPFS=1.
+
+    Runs before pytest's tmpdir plugin reads --basetemp. An explicit
+    --basetemp always wins, and xdist workers inherit the controller's.
+    Off by default: /dev/shm is small in containers (64 MB under Docker).
+    """
+    if os.environ.get("PYTEST_TMPFS") != "1":
+        return
+    if config.option.basetemp or hasattr(config, "workerinput"):
+        return
+    if not sys.platform.startswith("linux"):
+        return
+    if not (_SHM_DIR.is_dir() and os.access(_SHM_DIR, os.W_OK)):
+        return
+    basetemp = tempfile.mkdtemp(prefix="pytest-", dir=_SHM_DIR)
+    config.option.basetemp = basetemp
+    config.stash[_shm_basetemp_key] = basetemp
+
+
+def pytest_sessionfinish(session, exitstatus):
+    """Free the tmpfs basetemp, unless tests failed and their tmp_path is worth keeping."""
+    basetemp = session.config.stash.get(_shm_basetemp_key, None)
+    if not basetemp or hasattr(session.config, "workerinput"):
+        return
+    if session.testsfailed:
+        reporter = session.config.pluginmanager.get_plugin("terminalreporter")
+        if reporter is not None:
+            reporter.write_sep("-", f"tmp_path contents of failed tests kept in {basetemp}")
+        return
+    shutil.rmtree(basetemp, ignore_errors=True)
 
 
 @pytest.fixture
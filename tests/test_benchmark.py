@@ -3,16 +3,11 @@
 import argparse
 import asyncio
 import json
-import os
-import sys
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import benchmark
 import pytest
 
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
-
-import benchmark  # noqa: E402
-
 
 class TestPercentile:
     """Tests for the percentile() function."""
@@ -2,12 +2,9 @@
 
 import io
 import os
-import sys
 from unittest.mock import MagicMock, patch
 
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
-
-import health_server  # noqa: E402
+import health_server
 
 
 class TestHealthHandler:
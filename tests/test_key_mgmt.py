@@ -1,35 +1,53 @@
 """Unit tests for scripts/key_mgmt.py - API Key Management CLI."""
 
 import argparse
+import base64
 import os
+import re
+import shutil
 import stat
-import subprocess
 import sys
+from pathlib import Path
+from types import SimpleNamespace as NS
+from typing import ClassVar
 from unittest.mock import patch
 
+import key_mgmt
 import pytest
 
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
 
-import key_mgmt  # noqa: E402
-
-
-@pytest.fixture
-def keys_file(tmp_path):
-    """Create a temporary keys file with two test keys."""
-    path = tmp_path / "api_keys.txt"
+@pytest.fixture(scope="session")
+def _keys_template(tmp_path_factory):
+    """Write the canonical two-key file once per session."""
+    path = tmp_path_factory.mktemp("tpl") / "api_keys.txt"
     path.write_text(
         "# Test keys\n"
         "alice-laptop:sk-test-AAAAAAAAAAAAAAAAAAAAAAAAAAAAaaaa\n"
         "production-key:sk-test-BBBBBBBBBBBBBBBBBBBBBBBBBBBBbbbb\n"
     )
-    return str(path)
+    return path
 
 
 @pytest.fixture
-def empty_keys_file(tmp_path):
-    """Create an empty keys file."""
+def keys_file(tmp_path, _keys_template):
+    """Create a temporary keys file with two test keys."""
     path = tmp_path / "api_keys.txt"
+    shutil.copyfile(_keys_template, path)
+    return str(path)
+
+
+@pytest.fixture(scope="session")
+def keys_file_ro(_keys_template):
+    """Shared two-key file for tests that never modify it."""
+    original = _keys_template.read_bytes()
+    yield str(_keys_template)
+    assert _keys_template.read_bytes() == original, "read-only keys file was modified"
+
+
+@pytest.fixture(scope="session")
+def empty_keys_file(tmp_path_factory):
+    """Shared empty keys file; its only consumers never write to it."""
+    path = tmp_path_factory.mktemp("empty") / "api_keys.txt"
     path.write_text("")
     return str(path)
 
@@ -37,107 +55,132 @@ def empty_keys_file(tmp_path):
 class TestValidateKeyId:
     """Tests for key_id format validation."""
 
-    def test_valid_alphanumeric(self):
-        """Alphanumeric key_id is valid."""
-        assert key_mgmt.validate_key_id("alice123") is True
+    @pytest.mark.parametrize(
+        "key_id,expected",
+        [
+            ("alice123", True),
+            ("alice-laptop", True),
+            ("alice_laptop", True),
+            ("prod-key_01", True),
+            ("a", True),
+            ("a" * 64, True),
+            ("", False),
+            ("a" * 65, False),
+            ("alice@laptop", False),
+            ("alice laptop", False),
+            ("alice.laptop", False),
+            ("alice:laptop", False),
+            ("alice\n", False),
+            ("caf\u00e9", False),
+        ],
+    )
+    def test_validate_key_id(self, key_id, expected):
+        """Key_id must be 1-64 alphanumeric, hyphen, or underscore characters."""
+        assert key_mgmt.validate_key_id(key_id) is expected
+
 
-    def test_valid_with_hyphens(self):
-        """Key_id with hyphens is valid."""
-        assert key_mgmt.validate_key_id("alice-laptop") is True
+_LIST_EXPECTED = {"alice-laptop", "production-key", "2 key(s) configured", "KEY_ID", "active"}
+_LIST_EXPECTED_RE = re.compile("|".join(map(re.escape, sorted(_LIST_EXPECTED))))
 
-    def test_valid_with_underscores(self):
-        """Key_id with underscores is valid."""
-        assert key_mgmt.validate_key_id("alice_laptop") is True
 
-    def test_valid_mixed(self):
-        """Key_id with mixed characters is valid."""
-        assert key_mgmt.validate_key_id("prod-key_01") is True
+def _read_and_perms(path):
+    """Return (content, permission bits) of a file using a single open()."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        st = os.fstat(fd)
+        data = os.read(fd, st.st_size + 1).decode()
+    finally:
+        os.close(fd)
+    return data, stat.S_IMODE(st.st_mode)
 
-    def test_valid_single_char(self):
-        """Single character key_id is valid."""
-        assert key_mgmt.validate_key_id("a") is True
 
-    def test_valid_max_length(self):
-        """64-character key_id is valid (max length)."""
-        assert key_mgmt.validate_key_id("a" * 64) is True
+def _key_lines(content):
+    """Return the key lines (non-comment lines containing a colon) of keys-file content."""
+    return [line for line in content.splitlines() if ":" in line and not line.startswith("#")]
 
-    def test_invalid_empty(self):
-        """Empty string is not a valid key_id."""
-        assert key_mgmt.validate_key_id("") is False
 
-    def test_invalid_too_long(self):
-        """65-character key_id exceeds max length."""
-        assert key_mgmt.validate_key_id("a" * 65) is False
+def _parse_keys(path):
+    """Return a {key_id: rest_of_line} dict for the key lines in a keys file."""
+    return dict(line.split(":", 1) for line in _key_lines(Path(path).read_text()))
 
-    def test_invalid_special_chars(self):
-        """Special characters like @ are rejected."""
-        assert key_mgmt.validate_key_id("alice@laptop") is False
 
-    def test_invalid_spaces(self):
-        """Spaces are rejected."""
-        assert key_mgmt.validate_key_id("alice laptop") is False
+def _mkargs(**overrides):
+    """Build cmd_* args with CLI defaults; tests pass only the fields they care about."""
+    fields = {"name": None, "file": None, "quiet": False, "rate_limit": None, "expires": None}
+    fields.update(overrides)
+    return NS(**fields)
+
+
+@pytest.fixture
+def fast_keygen(monkeypatch):
+    """Replace the CSPRNG key generator with a fixed, well-formed key."""
+    monkeypatch.setattr(key_mgmt, "generate_api_key", lambda: key_mgmt.KEY_PREFIX + "A" * 43)
 
-    def test_invalid_dots(self):
-        """Dots are rejected."""
-        assert key_mgmt.validate_key_id("alice.laptop") is False
 
-    def test_invalid_colon(self):
-        """Colons are rejected."""
-        assert key_mgmt.validate_key_id("alice:laptop") is False
+@pytest.fixture(scope="session")
+def _hundred_keys():
+    """Generate 100 API keys once and share them across key-shape tests."""
+    return [key_mgmt.generate_api_key() for _ in range(100)]
 
 
 class TestGenerateApiKey:
     """Tests for API key generation."""
 
-    def test_starts_with_prefix(self):
-        """Generated key starts with sk- prefix."""
-        key = key_mgmt.generate_api_key()
-        assert key.startswith("sk-")
+    def test_starts_with_prefix(self, _hundred_keys):
+        """Generated keys start with sk- prefix."""
+        assert all(key.startswith("sk-") for key in _hundred_keys)
 
-    def test_correct_length(self):
-        """Generated key is 46 characters (3 prefix + 43 base64url)."""
-        key = key_mgmt.generate_api_key()
-        assert len(key) == 46
+    def test_correct_length(self, _hundred_keys):
+        """Generated keys are 46 characters (3 prefix + 43 base64url)."""
+        assert all(len(key) == 46 for key in _hundred_keys)
 
-    def test_unique_keys(self):
+    def test_unique_keys(self, _hundred_keys):
         """100 generated keys are all unique."""
-        keys = {key_mgmt.generate_api_key() for _ in range(100)}
-        assert len(keys) == 100
+        assert len(set(_hundred_keys)) == len(_hundred_keys) == 100
 
-    def test_valid_characters(self):
-        """Key suffix uses only base64url characters."""
-        key = key_mgmt.generate_api_key()
-        suffix = key[3:]
-        assert all(c.isalnum() or c in "-_" for c in suffix)
+    @pytest.mark.stress
+    def test_unique_keys_stress(self):
+        """100,000 generated keys are all unique (run with --stress)."""
+        keys = [key_mgmt.generate_api_key() for _ in range(100_000)]
+        assert len(set(keys)) == len(keys)
 
+    def test_valid_characters(self, _hundred_keys):
+        """Key suffixes use only base64url characters."""
+        for key in _hundred_keys:
+            assert all(c.isalnum() or c in "-_" for c in key[3:])
 
+    def test_suffix_decodes_to_32_random_bytes(self, _hundred_keys):
+        """Key suffixes are unpadded base64url encodings of 32 bytes."""
+        for key in _hundred_keys:
+            assert len(base64.urlsafe_b64decode(key[3:] + "=")) == 32
+
+
+@pytest.mark.usefixtures("fast_keygen")
 class TestGenerate:
     """Tests for the generate command."""
 
     def test_generate_creates_key(self, tmp_path):
         """Generate creates a valid key and appends to file."""
         file_path = str(tmp_path / "keys.txt")
-        args = argparse.Namespace(name="test-key", file=file_path, quiet=False)
+        args = NS(name="test-key", file=file_path, quiet=False)
         result = key_mgmt.cmd_generate(args)
         assert result == 0
         assert os.path.exists(file_path)
-        content = open(file_path).read()
+        content = Path(file_path).read_text()
         assert "test-key:" in content
         assert "sk-" in content
-        lines = [line for line in content.strip().split("\n") if line.strip()]
-        key_lines = [line for line in lines if not line.startswith("#")]
-        assert len(key_lines) == 1
+        assert len(_key_lines(content)) == 1
 
     def test_generate_duplicate_name_fails(self, keys_file):
         """Generate rejects duplicate key_id."""
-        args = argparse.Namespace(name="alice-laptop", file=keys_file, quiet=False)
+        args = NS(name="alice-laptop", file=keys_file, quiet=False)
         result = key_mgmt.cmd_generate(args)
         assert result == 1
 
     def test_generate_invalid_name_fails(self, tmp_path):
         """Generate rejects key_id with special characters."""
         file_path = str(tmp_path / "keys.txt")
-        args = argparse.Namespace(name="bad@name!", file=file_path, quiet=False)
+        args = NS(name="bad@name!", file=file_path, quiet=False)
         result = key_mgmt.cmd_generate(args)
         assert result == 1
         assert not os.path.exists(file_path)
@@ -145,7 +188,7 @@ class TestGenerate:
     def test_generate_quiet_mode(self, tmp_path, capsys):
         """Quiet mode outputs only the key value."""
         file_path = str(tmp_path / "keys.txt")
-        args = argparse.Namespace(name="quiet-key", file=file_path, quiet=True)
+        args = NS(name="quiet-key", file=file_path, quiet=True)
         result = key_mgmt.cmd_generate(args)
         assert result == 0
         captured = capsys.readouterr()
@@ -155,9 +198,9 @@ class TestGenerate:
 
     def test_generate_preserves_comments(self, keys_file):
         """Generate preserves existing comments and keys."""
-        args = argparse.Namespace(name="new-key", file=keys_file, quiet=False)
+        args = NS(name="new-key", file=keys_file, quiet=False)
         key_mgmt.cmd_generate(args)
-        content = open(keys_file).read()
+        content = Path(keys_file).read_text()
         assert "# Test keys" in content
         assert "alice-laptop:" in content
         assert "production-key:" in content
@@ -169,27 +212,24 @@ class TestList:
 
     def test_list_empty_file(self, empty_keys_file, capsys):
         """Empty file shows 0 keys."""
-        args = argparse.Namespace(file=empty_keys_file, quiet=False)
+        args = NS(file=empty_keys_file, quiet=False)
         result = key_mgmt.cmd_list(args)
         assert result == 0
         captured = capsys.readouterr()
         assert "0 key(s) configured" in captured.out
 
-    def test_list_with_keys(self, keys_file, capsys):
+    def test_list_with_keys(self, keys_file_ro, capsys):
         """Shows correct key_ids and count."""
-        args = argparse.Namespace(file=keys_file, quiet=False)
+        args = NS(file=keys_file_ro, quiet=False)
         result = key_mgmt.cmd_list(args)
         assert result == 0
         captured = capsys.readouterr()
-        assert "alice-laptop" in captured.out
-        assert "production-key" in captured.out
-        assert "2 key(s) configured" in captured.out
-        assert "KEY_ID" in captured.out
-        assert "active" in captured.out
+        found = set(_LIST_EXPECTED_RE.findall(captured.out))
+        assert found >= _LIST_EXPECTED, _LIST_EXPECTED - found
 
-    def test_list_never_shows_key_values(self, keys_file, capsys):
+    def test_list_never_shows_key_values(self, keys_file_ro, capsys):
         """List never displays actual API key values."""
-        args = argparse.Namespace(file=keys_file, quiet=False)
+        args = NS(file=keys_file_ro, quiet=False)
         key_mgmt.cmd_list(args)
         captured = capsys.readouterr()
         assert "sk-test-AAAA" not in captured.out
@@ -198,7 +238,7 @@ class TestList:
     def test_list_missing_file(self, tmp_path, capsys):
         """Missing file shows 0 keys with helpful message."""
         file_path = str(tmp_path / "nonexistent.txt")
-        args = argparse.Namespace(file=file_path, quiet=False)
+        args = NS(file=file_path, quiet=False)
         result = key_mgmt.cmd_list(args)
         assert result == 0
         captured = capsys.readouterr()
@@ -210,30 +250,30 @@ class TestRemove:
 
     def test_remove_existing_key(self, keys_file):
         """Remove deletes the correct key line."""
-        args = argparse.Namespace(name="alice-laptop", file=keys_file, quiet=False)
+        args = NS(name="alice-laptop", file=keys_file, quiet=False)
         result = key_mgmt.cmd_remove(args)
         assert result == 0
-        content = open(keys_file).read()
+        content = Path(keys_file).read_text()
         assert "alice-laptop" not in content
         assert "production-key" in content
 
-    def test_remove_nonexistent_fails(self, keys_file):
+    def test_remove_nonexistent_fails(self, keys_file_ro):
         """Remove fails for a key_id that does not exist."""
-        args = argparse.Namespace(name="nonexistent", file=keys_file, quiet=False)
+        args = NS(name="nonexistent", file=keys_file_ro, quiet=False)
         result = key_mgmt.cmd_remove(args)
         assert result == 1
 
     def test_remove_preserves_comments(self, keys_file):
         """Remove preserves comments and other keys."""
-        args = argparse.Namespace(name="alice-laptop", file=keys_file, quiet=False)
+        args = NS(name="alice-laptop", file=keys_file, quiet=False)
         key_mgmt.cmd_remove(args)
-        content = open(keys_file).read()
+        content = Path(keys_file).read_text()
         assert "# Test keys" in content
 
     def test_remove_missing_file_fails(self, tmp_path):
         """Remove fails if keys file does not exist."""
         file_path = str(tmp_path / "nonexistent.txt")
-        args = argparse.Namespace(name="any-key", file=file_path, quiet=False)
+        args = NS(name="any-key", file=file_path, quiet=False)
         result = key_mgmt.cmd_remove(args)
         assert result == 1
 
@@ -243,30 +283,23 @@ class TestRotate:
 
     def test_rotate_existing_key(self, keys_file):
         """Rotate changes the api_key but keeps the key_id."""
-        original_content = open(keys_file).read()
-        original_line = [
-            line for line in original_content.split("\n") if line.startswith("alice-laptop:")
-        ][0]
-        original_api_key = original_line.split(":", 1)[1]
-        args = argparse.Namespace(name="alice-laptop", file=keys_file, quiet=False)
+        original_api_key = _parse_keys(keys_file)["alice-laptop"]
+        args = NS(name="alice-laptop", file=keys_file, quiet=False)
         result = key_mgmt.cmd_rotate(args)
         assert result == 0
-        new_content = open(keys_file).read()
-        new_line = [line for line in new_content.split("\n") if line.startswith("alice-laptop:")][0]
-        new_api_key = new_line.split(":", 1)[1]
-        assert "alice-laptop:" in new_content
+        new_api_key = _parse_keys(keys_file)["alice-laptop"]
         assert new_api_key != original_api_key
         assert new_api_key.startswith("sk-")
 
-    def test_rotate_nonexistent_fails(self, keys_file):
+    def test_rotate_nonexistent_fails(self, keys_file_ro):
         """Rotate fails for a key_id that does not exist."""
-        args = argparse.Namespace(name="nonexistent", file=keys_file, quiet=False)
+        args = NS(name="nonexistent", file=keys_file_ro, quiet=False)
         result = key_mgmt.cmd_rotate(args)
         assert result == 1
 
     def test_rotate_quiet_mode(self, keys_file, capsys):
         """Quiet mode outputs only the new key value."""
-        args = argparse.Namespace(name="alice-laptop", file=keys_file, quiet=True)
+        args = NS(name="alice-laptop", file=keys_file, quiet=True)
         result = key_mgmt.cmd_rotate(args)
         assert result == 0
         captured = capsys.readouterr()
@@ -276,234 +309,177 @@ class TestRotate:
 
     def test_rotate_preserves_other_keys(self, keys_file):
         """Rotate does not modify other keys."""
-        original_content = open(keys_file).read()
-        prod_line = [
-            line for line in original_content.split("\n") if line.startswith("production-key:")
-        ][0]
-        args = argparse.Namespace(name="alice-laptop", file=keys_file, quiet=False)
+        original = _parse_keys(keys_file)
+        args = NS(name="alice-laptop", file=keys_file, quiet=False)
         key_mgmt.cmd_rotate(args)
-        new_content = open(keys_file).read()
-        assert prod_line in new_content
+        assert _parse_keys(keys_file)["production-key"] == original["production-key"]
 
     def test_rotate_missing_file_fails(self, tmp_path):
         """Rotate fails if keys file does not exist."""
         file_path = str(tmp_path / "nonexistent.txt")
-        args = argparse.Namespace(name="any-key", file=file_path, quiet=False)
+        args = NS(name="any-key", file=file_path, quiet=False)
         result = key_mgmt.cmd_rotate(args)
         assert result == 1
 
 
+@pytest.mark.usefixtures("fast_keygen")
 class TestFilePermissions:
     """Tests for file permission security."""
 
-    def test_file_permissions_after_generate(self, tmp_path):
-        """File has 0o600 permissions after generate."""
-        file_path = str(tmp_path / "keys.txt")
-        args = argparse.Namespace(name="test-key", file=file_path, quiet=True)
-        key_mgmt.cmd_generate(args)
-        file_stat = os.stat(file_path)
-        perms = stat.S_IMODE(file_stat.st_mode)
+    @pytest.mark.parametrize(
+        "cmd,name,marker,present",
+        [
+            (key_mgmt.cmd_generate, "new-key", "new-key:", True),
+            (key_mgmt.cmd_remove, "alice-laptop", "alice-laptop:", False),
+            (key_mgmt.cmd_rotate, "alice-laptop", "alice-laptop:sk-test-AAAA", False),
+        ],
+        ids=lambda value: value.__name__ if callable(value) else None,
+    )
+    def test_file_permissions_after_command(self, keys_file, cmd, name, marker, present):
+        """File has 0o600 permissions after each mutating command."""
+        args = NS(name=name, file=keys_file, quiet=True)
+        assert cmd(args) == 0
+        content, perms = _read_and_perms(keys_file)
         assert perms == 0o600
+        assert (marker in content) is present
 
-    def test_file_permissions_after_remove(self, keys_file):
-        """File has 0o600 permissions after remove."""
-        args = argparse.Namespace(name="alice-laptop", file=keys_file, quiet=False)
-        key_mgmt.cmd_remove(args)
-        file_stat = os.stat(keys_file)
-        perms = stat.S_IMODE(file_stat.st_mode)
-        assert perms == 0o600
 
-    def test_file_permissions_after_rotate(self, keys_file):
-        """File has 0o600 permissions after rotate."""
-        args = argparse.Namespace(name="alice-laptop", file=keys_file, quiet=False)
-        key_mgmt.cmd_rotate(args)
-        file_stat = os.stat(keys_file)
-        perms = stat.S_IMODE(file_stat.st_mode)
-        assert perms == 0o600
+@pytest.fixture(scope="class")
+def atomic_dir(tmp_path_factory):
+    """One directory shared per test class; each test uses its own file name."""
+    return tmp_path_factory.mktemp("atomic")
 
 
 class TestAtomicWrite:
     """Tests for atomic file write behavior."""
 
-    def test_atomic_write_creates_file(self, tmp_path):
+    def test_atomic_write_creates_file(self, atomic_dir):
         """Atomic write creates a new file."""
-        file_path = str(tmp_path / "new_keys.txt")
+        file_path = str(atomic_dir / "new_keys.txt")
         key_mgmt.atomic_write(file_path, ["line1", "line2"])
         assert os.path.exists(file_path)
-        content = open(file_path).read()
+        content = Path(file_path).read_text()
         assert "line1\n" in content
         assert "line2\n" in content
 
-    def test_atomic_write_replaces_file(self, tmp_path):
+    def test_atomic_write_replaces_file(self, atomic_dir):
         """Atomic write replaces existing content entirely."""
-        file_path = str(tmp_path / "keys.txt")
-        open(file_path, "w").write("old content\n")
+        file_path = str(atomic_dir / "replace_keys.txt")
+        Path(file_path).write_text("old content\n")
         key_mgmt.atomic_write(file_path, ["new content"])
-        content = open(file_path).read()
-        assert "old content" not in content
-        assert "new content" in content
+        assert Path(file_path).read_bytes() == b"new content\n"
 
     def test_atomic_write_no_temp_files_left(self, tmp_path):
-        """No temporary files remain after successful write."""
+        """No temporary files remain after successful write (needs its own directory)."""
         file_path = str(tmp_path / "keys.txt")
         key_mgmt.atomic_write(file_path, ["test"])
-        remaining = os.listdir(tmp_path)
-        assert remaining == ["keys.txt"]
+        with os.scandir(tmp_path) as entries:
+            names = {entry.name for entry in entries}
+        assert names == {"keys.txt"}
 
-    def test_atomic_write_permissions(self, tmp_path):
+    def test_atomic_write_permissions(self, atomic_dir):
         """Written file has 0o600 permissions."""
-        file_path = str(tmp_path / "keys.txt")
+        file_path = str(atomic_dir / "perms_keys.txt")
         key_mgmt.atomic_write(file_path, ["test"])
-        file_stat = os.stat(file_path)
-        perms = stat.S_IMODE(file_stat.st_mode)
+        content, perms = _read_and_perms(file_path)
         assert perms == 0o600
+        assert content == "test\n"
 
-    def test_atomic_write_creates_parent_dirs(self, tmp_path):
+    def test_atomic_write_creates_parent_dirs(self, atomic_dir):
         """Atomic write creates parent directories if needed."""
-        file_path = str(tmp_path / "subdir" / "keys.txt")
+        file_path = str(atomic_dir / "subdir" / "keys.txt")
         key_mgmt.atomic_write(file_path, ["test"])
         assert os.path.exists(file_path)
 
 
 class TestCLIIntegration:
-    """Integration tests running the CLI as a subprocess."""
+    """End-to-end tests of the CLI entry point."""
 
     SCRIPT = os.path.join(os.path.dirname(__file__), "..", "scripts", "key_mgmt.py")
+    CMD_BASE: ClassVar[list[str]] = [sys.executable, SCRIPT]
 
-    def test_cli_generate_and_list(self, tmp_path):
-        """Full round-trip: generate a key, then list it."""
+    def test_cli_lifecycle(self, tmp_path, capsys):
+        """Generate, list, rotate, and remove a key against one file."""
         file_path = str(tmp_path / "keys.txt")
-        result = subprocess.run(
-            [sys.executable, self.SCRIPT, "--file", file_path, "generate", "--name", "cli-test"],
-            capture_output=True,
-            text=True,
-        )
-        assert result.returncode == 0
-        assert "cli-test" in result.stdout
-        assert "sk-" in result.stdout
-        result = subprocess.run(
-            [sys.executable, self.SCRIPT, "--file", file_path, "list"],
-            capture_output=True,
-            text=True,
-        )
-        assert result.returncode == 0
-        assert "cli-test" in result.stdout
-        assert "1 key(s) configured" in result.stdout
 
-    def test_cli_quiet_generate(self, tmp_path):
+        assert key_mgmt.main(["--file", file_path, "generate", "--name", "cli-test"]) == 0
+        out = capsys.readouterr().out
+        assert "cli-test" in out
+        assert "sk-" in out
+        original_key = key_mgmt.parse_key_line(Path(file_path).read_text().splitlines()[-1])[1]
+
+        assert key_mgmt.main(["--file", file_path, "list"]) == 0
+        out = capsys.readouterr().out
+        assert "cli-test" in out
+        assert "1 key(s) configured" in out
+
+        assert key_mgmt.main(["--file", file_path, "--quiet", "rotate", "--name", "cli-test"]) == 0
+        new_key = capsys.readouterr().out.strip()
+        assert new_key.startswith("sk-")
+        assert new_key != original_key
+
+        assert key_mgmt.main(["--file", file_path, "remove", "--name", "cli-test"]) == 0
+        capsys.readouterr()
+
+        assert key_mgmt.main(["--file", file_path, "list"]) == 0
+        out = capsys.readouterr().out
+        assert "cli-test" not in out
+        assert "0 key(s) configured" in out
+
+    def test_cli_quiet_generate(self, tmp_path, capsys):
         """Quiet mode outputs only the key value."""
         file_path = str(tmp_path / "keys.txt")
-        result = subprocess.run(
-            [
-                sys.executable,
-                self.SCRIPT,
-                "--file",
-                file_path,
-                "--quiet",
-                "generate",
-                "--name",
-                "quiet-test",
-            ],
-            capture_output=True,
-            text=True,
-        )
-        assert result.returncode == 0
-        output = result.stdout.strip()
+        argv = ["key_mgmt", "--file", file_path, "--quiet", "generate", "--name", "quiet-test"]
+        with patch("sys.argv", argv):
+            assert key_mgmt.main() == 0
+        output = capsys.readouterr().out.strip()
         assert output.startswith("sk-")
         assert len(output) == 46
 
-    def test_cli_no_command_shows_help(self):
-        """Running without a command exits with code 1."""
-        result = subprocess.run(
-            [sys.executable, self.SCRIPT, "--file", "/tmp/fake.txt"],
-            capture_output=True,
-            text=True,
-        )
-        assert result.returncode == 1
+    @pytest.mark.slow
+    @pytest.mark.serial
+    def test_cli_smoke(self, tmp_path):
+        """The script runs as a standalone program."""
+        import subprocess  # only this test spawns a process; keep collection light
 
-    def test_cli_remove_and_verify(self, tmp_path):
-        """Generate, remove, verify key is gone."""
         file_path = str(tmp_path / "keys.txt")
-        subprocess.run(
-            [sys.executable, self.SCRIPT, "--file", file_path, "generate", "--name", "to-remove"],
-            capture_output=True,
-            text=True,
-        )
         result = subprocess.run(
-            [sys.executable, self.SCRIPT, "--file", file_path, "remove", "--name", "to-remove"],
+            self.CMD_BASE + ["--file", file_path, "list"],
             capture_output=True,
             text=True,
+            check=False,
         )
         assert result.returncode == 0
-        result = subprocess.run(
-            [sys.executable, self.SCRIPT, "--file", file_path, "list"],
-            capture_output=True,
-            text=True,
-        )
-        assert "to-remove" not in result.stdout
         assert "0 key(s) configured" in result.stdout
 
-    def test_cli_rotate_and_verify(self, tmp_path):
-        """Generate, rotate, verify key changed."""
-        file_path = str(tmp_path / "keys.txt")
-        gen_result = subprocess.run(
-            [
-                sys.executable,
-                self.SCRIPT,
-                "--file",
-                file_path,
-                "--quiet",
-                "generate",
-                "--name",
-                "to-rotate",
-            ],
-            capture_output=True,
-            text=True,
-        )
-        original_key = gen_result.stdout.strip()
-        rot_result = subprocess.run(
-            [
-                sys.executable,
-                self.SCRIPT,
-                "--file",
-                file_path,
-                "--quiet",
-                "rotate",
-                "--name",
-                "to-rotate",
-            ],
-            capture_output=True,
-            text=True,
-        )
-        assert rot_result.returncode == 0
-        new_key = rot_result.stdout.strip()
-        assert new_key != original_key
-        assert new_key.startswith("sk-")
+    def test_cli_no_command_shows_help(self, capsys):
+        """Running without a command prints the real parser's help and returns 1."""
+        assert key_mgmt.main([]) == 1
+        assert "usage: key_mgmt" in capsys.readouterr().out
 
 
 class TestGetDefaultKeysFile:
     """Tests for get_default_keys_file() environment variable resolution."""
 
-    def test_auth_keys_file_env(self, monkeypatch):
-        """AUTH_KEYS_FILE takes precedence over DATA_DIR."""
-        monkeypatch.setenv("AUTH_KEYS_FILE", "/custom/path/keys.txt")
-        monkeypatch.setenv("DATA_DIR", "/some/data")
-        result = key_mgmt.get_default_keys_file()
-        assert result == "/custom/path/keys.txt"
-
-    def test_data_dir_env(self, monkeypatch):
-        """DATA_DIR is used when AUTH_KEYS_FILE is not set."""
-        monkeypatch.delenv("AUTH_KEYS_FILE", raising=False)
-        monkeypatch.setenv("DATA_DIR", "/my/data")
-        result = key_mgmt.get_default_keys_file()
-        assert result == "/my/data/api_keys.txt"
-
-    def test_default_path(self, monkeypatch):
-        """Falls back to /data/api_keys.txt when no env vars set."""
-        monkeypatch.delenv("AUTH_KEYS_FILE", raising=False)
-        monkeypatch.delenv("DATA_DIR", raising=False)
-        result = key_mgmt.get_default_keys_file()
-        assert result == "/data/api_keys.txt"
+    @pytest.mark.parametrize(
+        "env,expected",
+        [
+            (
+                {"AUTH_KEYS_FILE": "/custom/path/keys.txt", "DATA_DIR": "/some/data"},
+                "/custom/path/keys.txt",
+            ),
+            ({"DATA_DIR": "/my/data"}, "/my/data/api_keys.txt"),
+            ({}, "/data/api_keys.txt"),
+        ],
+        ids=["auth_keys_file_wins", "data_dir", "default"],
+    )
+    def test_default_keys_file(self, monkeypatch, env, expected):
+        """AUTH_KEYS_FILE beats DATA_DIR, which beats the /data fallback."""
+        for name in ("AUTH_KEYS_FILE", "DATA_DIR"):
+            monkeypatch.delenv(name, raising=False)
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        assert key_mgmt.get_default_keys_file() == expected
 
 
 class TestLoadKeysFileEdgeCases:
@@ -541,6 +517,57 @@ class TestLoadKeysFileEdgeCases:
         assert key_count == 1
         assert other_count >= 2
 
+    @pytest.mark.parametrize(
+        "line,expected",
+        [
+            ("  alice : sk-key", ("key", "alice")),
+            ("bad id:sk-key", ("key", "bad id")),
+            (":sk-key", ("key", "")),
+            ("  # note: not a key", ("other", "")),
+            ("   ", ("other", "")),
+        ],
+    )
+    def test_line_classification(self, tmp_path, line, expected):
+        """Key lines are any non-comment line with a colon; key_id is trimmed."""
+        path = tmp_path / "keys.txt"
+        path.write_text(line + "\n")
+        assert key_mgmt.load_keys_file(str(path)) == [(*expected, line)]
+
+    def test_long_whitespace_without_colon(self, tmp_path):
+        """A colon-less line with a long whitespace run is classified in linear time."""
+        line = "a" + " " * 40000
+        path = tmp_path / "keys.txt"
+        path.write_text(line + "\n")
+        assert key_mgmt.load_keys_file(str(path)) == [("other", "", line)]
+
+    def test_iter_keys_file_yields_key_lines_only(self, keys_file_ro, tmp_path):
+        """iter_keys_file() skips comments and yields (key_id, line) pairs."""
+        assert [kid for kid, _ in key_mgmt.iter_keys_file(keys_file_ro)] == [
+            "alice-laptop",
+            "production-key",
+        ]
+        assert list(key_mgmt.iter_keys_file(str(tmp_path / "missing.txt"))) == []
+
+    @pytest.mark.parametrize("sep", ["\x0c", "\u2028"])
+    def test_non_newline_separators_stay_in_comment(self, tmp_path, sep):
+        """Form feed / LINE SEPARATOR inside a comment do not start a new key line."""
+        path = tmp_path / "keys.txt"
+        path.write_text(f"# note{sep}bob:sk-old\nalice:sk-a\n", encoding="utf-8")
+        result = key_mgmt.load_keys_file(str(path))
+        assert result == [("other", "", f"# note{sep}bob:sk-old"), ("key", "alice", "alice:sk-a")]
+        assert [kid for kid, _ in key_mgmt.iter_keys_file(str(path))] == ["alice"]
+
+        args = NS(name="alice", file=str(path), quiet=True)
+        assert key_mgmt.cmd_remove(args) == 0
+        assert path.read_bytes().decode("utf-8") == f"# note{sep}bob:sk-old\n"
+
+    def test_crlf_line_endings(self, tmp_path):
+        """Windows line endings are stripped like text-mode reads would."""
+        path = tmp_path / "keys.txt"
+        path.write_bytes(b"# comment\r\nalice:sk-key\r\n")
+        result = key_mgmt.load_keys_file(str(path))
+        assert result == [("other", "", "# comment"), ("key", "alice", "alice:sk-key")]
+
 
 class TestAtomicWriteFailure:
     """Tests for atomic_write() error handling."""
@@ -548,14 +575,26 @@ class TestAtomicWriteFailure:
     def test_atomic_write_cleanup_on_failure(self, tmp_path):
         """Temp file is cleaned up if writing fails."""
         file_path = str(tmp_path / "keys.txt")
-        with patch("key_mgmt.os.fdopen") as mock_fdopen:
-            mock_fdopen.side_effect = OSError("Disk full")
+        with patch("key_mgmt.os.write") as mock_write:
+            mock_write.side_effect = OSError("Disk full")
             with pytest.raises(OSError, match="Disk full"):
                 key_mgmt.atomic_write(file_path, ["test line"])
         remaining = os.listdir(tmp_path)
         temp_files = [f for f in remaining if f.startswith(".keys_")]
         assert len(temp_files) == 0
 
+    def test_atomic_write_handles_short_writes(self, tmp_path):
+        """Partial os.write() results are retried until the payload is written."""
+        file_path = tmp_path / "keys.txt"
+        real_write = os.write
+
+        def one_byte_write(fd, data):
+            return real_write(fd, bytes(data[:1]))
+
+        with patch("key_mgmt.os.write", side_effect=one_byte_write):
+            key_mgmt.atomic_write(str(file_path), ["ab", "cd"])
+        assert file_path.read_text() == "ab\ncd\n"
+
 
 class TestBuildParserKeyMgmt:
     """Tests for build_parser() CLI argument structure."""
@@ -565,11 +604,12 @@ class TestBuildParserKeyMgmt:
         parser = key_mgmt.build_parser()
         assert isinstance(parser, argparse.ArgumentParser)
 
-    def test_generate_subcommand(self):
-        """Parser accepts generate subcommand with --name."""
+    @pytest.mark.parametrize("command", ["generate", "remove", "rotate"])
+    def test_named_subcommand(self, command):
+        """Parser accepts generate/remove/rotate subcommands with --name."""
         parser = key_mgmt.build_parser()
-        args = parser.parse_args(["--file", "/tmp/keys.txt", "generate", "--name", "test-key"])
-        assert args.command == "generate"
+        args = parser.parse_args(["--file", "/tmp/keys.txt", command, "--name", "test-key"])
+        assert args.command == command
         assert args.name == "test-key"
 
     def test_list_subcommand(self):
@@ -578,20 +618,6 @@ class TestBuildParserKeyMgmt:
         args = parser.parse_args(["--file", "/tmp/keys.txt", "list"])
         assert args.command == "list"
 
-    def test_remove_subcommand(self):
-        """Parser accepts remove subcommand with --name."""
-        parser = key_mgmt.build_parser()
-        args = parser.parse_args(["--file", "/tmp/keys.txt", "remove", "--name", "test-key"])
-        assert args.command == "remove"
-        assert args.name == "test-key"
-
-    def test_rotate_subcommand(self):
-        """Parser accepts rotate subcommand with --name."""
-        parser = key_mgmt.build_parser()
-        args = parser.parse_args(["--file", "/tmp/keys.txt", "rotate", "--name", "test-key"])
-        assert args.command == "rotate"
-        assert args.name == "test-key"
-
     def test_quiet_flag(self):
         """Parser accepts --quiet flag."""
         parser = key_mgmt.build_parser()
@@ -611,13 +637,14 @@ class TestBuildParserKeyMgmt:
         assert args.command is None
 
 
+@pytest.mark.usefixtures("fast_keygen")
 class TestMainFunction:
     """Tests for main() CLI entry point."""
 
     def test_main_no_command_returns_1(self):
         """No command argument returns exit code 1."""
         with patch("key_mgmt.build_parser") as mock_bp:
-            mock_args = argparse.Namespace(command=None)
+            mock_args = NS(command=None)
             mock_bp.return_value.parse_args.return_value = mock_args
             result = key_mgmt.main()
             assert result == 1
@@ -633,7 +660,7 @@ class TestMainFunction:
     def test_main_list_command(self, tmp_path):
         """List command via main() succeeds."""
         file_path = str(tmp_path / "keys.txt")
-        open(file_path, "w").write("test:sk-test-key\n")
+        Path(file_path).write_text("test:sk-test-key\n")
         with patch("sys.argv", ["key_mgmt", "--file", file_path, "list"]):
             result = key_mgmt.main()
             assert result == 0
@@ -641,15 +668,40 @@ class TestMainFunction:
     def test_main_unknown_command_returns_1(self):
         """Unknown command returns exit code 1."""
         with patch("key_mgmt.build_parser") as mock_bp:
-            mock_args = argparse.Namespace(command="unknown_command")
+            mock_args = NS(command="unknown_command", file="/tmp/keys.txt")
             mock_bp.return_value.parse_args.return_value = mock_args
             result = key_mgmt.main()
             assert result == 1
 
+    def test_main_accepts_argv(self, tmp_path):
+        """main() parses an explicit argv list instead of sys.argv."""
+        file_path = str(tmp_path / "keys.txt")
+        result = key_mgmt.main(["--file", file_path, "generate", "--name", "argv-key"])
+        assert result == 0
+        assert "argv-key:" in Path(file_path).read_text()
+
+    def test_main_resolves_default_file_from_env(self, tmp_path, monkeypatch):
+        """Without --file, main() reads AUTH_KEYS_FILE at call time."""
+        file_path = str(tmp_path / "env_keys.txt")
+        monkeypatch.setenv("AUTH_KEYS_FILE", file_path)
+        result = key_mgmt.main(["generate", "--name", "env-key"])
+        assert result == 0
+        assert "env-key:" in Path(file_path).read_text()
+
+    def test_cached_parser_drives_commands(self, tmp_path):
+        """The cached parser produces args usable by cmd_* directly."""
+        file_path = str(tmp_path / "keys.txt")
+        args = key_mgmt.build_parser().parse_args(["--file", file_path, "generate", "--name", "x"])
+        assert key_mgmt.cmd_generate(args) == 0
+
+    def test_build_parser_is_cached(self):
+        """Repeated build_parser() calls return the same parser instance."""
+        assert key_mgmt.build_parser() is key_mgmt.build_parser()
+
     def test_main_remove_command(self, tmp_path):
         """Remove command via main() removes key."""
         file_path = str(tmp_path / "keys.txt")
-        open(file_path, "w").write("test-key:sk-test-key\n")
+        Path(file_path).write_text("test-key:sk-test-key\n")
         with patch("sys.argv", ["key_mgmt", "--file", file_path, "remove", "--name", "test-key"]):
             result = key_mgmt.main()
             assert result == 0
@@ -657,7 +709,7 @@ class TestMainFunction:
     def test_main_rotate_command(self, tmp_path):
         """Rotate command via main() rotates key."""
         file_path = str(tmp_path / "keys.txt")
-        open(file_path, "w").write("test-key:sk-test-key\n")
+        Path(file_path).write_text("test-key:sk-test-key\n")
         with patch("sys.argv", ["key_mgmt", "--file", file_path, "rotate", "--name", "test-key"]):
             result = key_mgmt.main()
             assert result == 0
@@ -669,16 +721,16 @@ class TestListQuietMode:
     def test_list_quiet_mode_missing_file(self, tmp_path, capsys):
         """Quiet mode with missing file suppresses detailed messages."""
         file_path = str(tmp_path / "nonexistent.txt")
-        args = argparse.Namespace(file=file_path, quiet=True)
+        args = NS(file=file_path, quiet=True)
         result = key_mgmt.cmd_list(args)
         assert result == 0
         captured = capsys.readouterr()
         assert "No keys file found" not in captured.out
         assert "0 key(s) configured" in captured.out
 
-    def test_list_quiet_mode_with_keys(self, keys_file, capsys):
+    def test_list_quiet_mode_with_keys(self, keys_file_ro, capsys):
         """Quiet mode suppresses headers but still shows count."""
-        args = argparse.Namespace(file=keys_file, quiet=True)
+        args = NS(file=keys_file_ro, quiet=True)
         result = key_mgmt.cmd_list(args)
         assert result == 0
         captured = capsys.readouterr()
@@ -691,7 +743,7 @@ class TestRemoveQuietMode:
 
     def test_remove_quiet_mode(self, keys_file, capsys):
         """Quiet mode suppresses success message."""
-        args = argparse.Namespace(name="alice-laptop", file=keys_file, quiet=True)
+        args = NS(name="alice-laptop", file=keys_file, quiet=True)
         result = key_mgmt.cmd_remove(args)
         assert result == 0
         captured = capsys.readouterr()
@@ -746,10 +798,16 @@ class TestParseExpiration:
             key_mgmt.parse_expiration("not-a-date")
 
     def test_invalid_relative_unit_raises(self):
-        """Invalid relative unit (e.g. '30x') raises ValueError."""
-        with pytest.raises(ValueError, match="Invalid expiration format"):
+        """Invalid relative unit (e.g. '30x') raises ValueError naming the unit."""
+        with pytest.raises(ValueError, match="Invalid expiration format.*Unknown time unit: x"):
             key_mgmt.parse_expiration("30x")
 
+    @pytest.mark.parametrize("value", ["d", "1.5d", "-5h", "30 m", "m30"])
+    def test_malformed_relative_raises(self, value):
+        """Relative values need a plain decimal amount followed by the unit."""
+        with pytest.raises(ValueError, match="Invalid expiration format"):
+            key_mgmt.parse_expiration(value)
+
 
 # ---------------------------------------------------------------------------
 # build_key_line / parse_key_line tests
@@ -834,60 +892,38 @@ class TestGenerateWithRateLimit:
     def test_generate_with_rate_limit(self, tmp_path):
         """Generate creates a key with per-key rate limit."""
         file_path = str(tmp_path / "keys.txt")
-        args = argparse.Namespace(
-            name="test-key",
-            file=file_path,
-            quiet=False,
-            rate_limit=120,
-            expires=None,
-        )
+        args = _mkargs(name="test-key", file=file_path, rate_limit=120)
         result = key_mgmt.cmd_generate(args)
         assert result == 0
-        content = open(file_path).read()
+        content = Path(file_path).read_text()
         # Should have 3 fields: key_id:api_key:120
-        key_lines = [ln for ln in content.strip().split("\n") if not ln.startswith("#")]
+        key_lines = _key_lines(content)
         assert len(key_lines) == 1
-        parts = key_lines[0].split(":")
-        assert parts[0] == "test-key"
-        assert parts[1].startswith("sk-")
-        assert parts[2] == "120"
+        key_id, api_key, rate_limit, _ = key_mgmt.parse_key_line(key_lines[0])
+        assert key_id == "test-key"
+        assert api_key.startswith("sk-")
+        assert rate_limit == "120"
 
     def test_generate_with_zero_rate_limit_fails(self, tmp_path):
         """Generate rejects zero rate limit."""
         file_path = str(tmp_path / "keys.txt")
-        args = argparse.Namespace(
-            name="test-key",
-            file=file_path,
-            quiet=False,
-            rate_limit=0,
-            expires=None,
-        )
+        args = _mkargs(name="test-key", file=file_path, rate_limit=0)
         result = key_mgmt.cmd_generate(args)
         assert result == 1
+        assert not os.path.exists(file_path)
 
     def test_generate_with_negative_rate_limit_fails(self, tmp_path):
         """Generate rejects negative rate limit."""
         file_path = str(tmp_path / "keys.txt")
-        args = argparse.Namespace(
-            name="test-key",
-            file=file_path,
-            quiet=False,
-            rate_limit=-5,
-            expires=None,
-        )
+        args = _mkargs(name="test-key", file=file_path, rate_limit=-5)
         result = key_mgmt.cmd_generate(args)
         assert result == 1
+        assert not os.path.exists(file_path)
 
     def test_generate_rate_limit_output(self, tmp_path, capsys):
         """Generate shows rate limit in non-quiet output."""
         file_path = str(tmp_path / "keys.txt")
-        args = argparse.Namespace(
-            name="test-key",
-            file=file_path,
-            quiet=False,
-            rate_limit=120,
-            expires=None,
-        )
+        args = _mkargs(name="test-key", file=file_path, rate_limit=120)
         key_mgmt.cmd_generate(args)
         captured = capsys.readouterr()
         assert "rate_limit=120/min" in captured.out
@@ -899,80 +935,53 @@ class TestGenerateWithExpires:
     def test_generate_with_iso_expiration(self, tmp_path):
         """Generate creates a key with ISO 8601 expiration."""
         file_path = str(tmp_path / "keys.txt")
-        args = argparse.Namespace(
-            name="test-key",
-            file=file_path,
-            quiet=False,
-            rate_limit=None,
-            expires="2026-03-01T00:00:00",
-        )
+        args = _mkargs(name="test-key", file=file_path, expires="2026-03-01T00:00:00")
         result = key_mgmt.cmd_generate(args)
         assert result == 0
-        content = open(file_path).read()
+        content = Path(file_path).read_text()
         assert "2026-03-01T00:00:00" in content
 
     def test_generate_with_relative_expiration(self, tmp_path):
         """Generate creates a key with relative expiration (30d)."""
         file_path = str(tmp_path / "keys.txt")
-        args = argparse.Namespace(
-            name="test-key",
-            file=file_path,
-            quiet=False,
-            rate_limit=None,
-            expires="30d",
-        )
+        args = _mkargs(name="test-key", file=file_path, expires="30d")
         result = key_mgmt.cmd_generate(args)
         assert result == 0
-        content = open(file_path).read()
+        content = Path(file_path).read_text()
         # Should contain a computed ISO 8601 date
-        key_lines = [ln for ln in content.strip().split("\n") if not ln.startswith("#")]
-        parts = key_lines[0].split(":", 3)
-        # key_id:api_key::expiration (4 parts, empty rate limit)
-        assert len(parts) >= 4
-        assert parts[2] == ""  # empty rate limit
+        key_lines = _key_lines(content)
+        # key_id:api_key::expiration (empty rate limit)
+        _, _, rate_limit, expiration = key_mgmt.parse_key_line(key_lines[0])
+        assert rate_limit == ""
+        assert expiration
 
     def test_generate_with_invalid_expiration_fails(self, tmp_path):
         """Generate rejects invalid expiration format."""
         file_path = str(tmp_path / "keys.txt")
-        args = argparse.Namespace(
-            name="test-key",
-            file=file_path,
-            quiet=False,
-            rate_limit=None,
-            expires="not-a-date",
-        )
+        args = _mkargs(name="test-key", file=file_path, expires="not-a-date")
         result = key_mgmt.cmd_generate(args)
         assert result == 1
+        assert not os.path.exists(file_path)
 
     def test_generate_with_both_rate_limit_and_expires(self, tmp_path):
         """Generate creates a key with both rate limit and expiration."""
         file_path = str(tmp_path / "keys.txt")
-        args = argparse.Namespace(
-            name="test-key",
-            file=file_path,
-            quiet=False,
-            rate_limit=300,
-            expires="2026-12-31T23:59:59",
+        args = _mkargs(
+            name="test-key", file=file_path, rate_limit=300, expires="2026-12-31T23:59:59"
         )
         result = key_mgmt.cmd_generate(args)
         assert result == 0
-        content = open(file_path).read()
-        key_lines = [ln for ln in content.strip().split("\n") if not ln.startswith("#")]
-        parts = key_lines[0].split(":", 3)
-        assert parts[0] == "test-key"
-        assert parts[2] == "300"
-        assert "2026-12-31T23:59:59" in parts[3]
+        content = Path(file_path).read_text()
+        key_lines = _key_lines(content)
+        key_id, _, rate_limit, expiration = key_mgmt.parse_key_line(key_lines[0])
+        assert key_id == "test-key"
+        assert rate_limit == "300"
+        assert expiration == "2026-12-31T23:59:59"
 
     def test_generate_expiration_output(self, tmp_path, capsys):
         """Generate shows expiration in non-quiet output."""
         file_path = str(tmp_path / "keys.txt")
-        args = argparse.Namespace(
-            name="test-key",
-            file=file_path,
-            quiet=False,
-            rate_limit=None,
-            expires="2026-03-01T00:00:00",
-        )
+        args = _mkargs(name="test-key", file=file_path, expires="2026-03-01T00:00:00")
         key_mgmt.cmd_generate(args)
         captured = capsys.readouterr()
         assert "expires=2026-03-01T00:00:00" in captured.out
@@ -983,66 +992,80 @@ class TestGenerateWithExpires:
 # ---------------------------------------------------------------------------
 
 
+@pytest.fixture(scope="class")
+def extended_keys_file(tmp_path_factory):
+    """One keys file covering every extended-format column, shared by read-only list tests."""
+    path = tmp_path_factory.mktemp("extended") / "keys.txt"
+    path.write_text(
+        "rate-key:sk-test-AAAAAAAAAAAAAAAAAAAAAAAAAAAAaaaa:120\n"
+        "plain-key:sk-test-BBBBBBBBBBBBBBBBBBBBBBBBBBBBbbbb\n"
+        "future-key:sk-test-CCCCCCCCCCCCCCCCCCCCCCCCCCCCcccc::2099-12-31T23:59:59\n"
+        "past-key:sk-test-DDDDDDDDDDDDDDDDDDDDDDDDDDDDdddd::2020-01-01T00:00:00\n"
+        "full-key:sk-test-EEEEEEEEEEEEEEEEEEEEEEEEEEEEeeee:120:2026-03-01T00:00:00\n"
+    )
+    original = path.read_bytes()
+    yield str(path)
+    assert path.read_bytes() == original, "extended keys file was modified"
+
+
+def _list_rows(file_path, capsys):
+    """Run cmd_list and return (header, {key_id: row}) from its output."""
+    key_mgmt.cmd_list(NS(file=file_path, quiet=False))
+    header, *rows = capsys.readouterr().out.splitlines()
+    return header, {row.split(None, 1)[0]: row for row in rows[:-1]}
+
+
 class TestListWithExtendedFormat:
     """Tests for list command showing rate limits and expiration."""
 
-    def test_list_shows_rate_limit(self, tmp_path, capsys):
+    def test_list_shows_rate_limit(self, extended_keys_file, capsys):
         """List shows per-key rate limit when configured."""
-        path = tmp_path / "keys.txt"
-        path.write_text("test-key:sk-test-AAAAAAAAAAAAAAAAAAAAAAAAAAAAaaaa:120\n")
-        args = argparse.Namespace(file=str(path), quiet=False)
-        key_mgmt.cmd_list(args)
-        captured = capsys.readouterr()
-        assert "120/min" in captured.out
-        assert "RATE_LIMIT" in captured.out
+        header, rows = _list_rows(extended_keys_file, capsys)
+        assert "RATE_LIMIT" in header
+        assert "120/min" in rows["rate-key"]
+        assert "120/min" in rows["full-key"]
 
-    def test_list_shows_default_rate_limit(self, tmp_path, capsys):
+    def test_list_shows_default_rate_limit(self, extended_keys_file, capsys):
         """List shows 'default' when no per-key rate limit is set."""
-        path = tmp_path / "keys.txt"
-        path.write_text("test-key:sk-test-AAAAAAAAAAAAAAAAAAAAAAAAAAAAaaaa\n")
-        args = argparse.Namespace(file=str(path), quiet=False)
-        key_mgmt.cmd_list(args)
-        captured = capsys.readouterr()
-        assert "default" in captured.out
-
-    def test_list_shows_expiration(self, tmp_path, capsys):
-        """List shows expiration date when configured."""
-        path = tmp_path / "keys.txt"
-        path.write_text("test-key:sk-test-AAAAAAAAAAAAAAAAAAAAAAAAAAAAaaaa::2026-03-01T00:00:00\n")
-        args = argparse.Namespace(file=str(path), quiet=False)
-        key_mgmt.cmd_list(args)
-        captured = capsys.readouterr()
-        assert "2026-03-01T00:00:00" in captured.out
-        assert "EXPIRES" in captured.out
-
-    def test_list_shows_expired_status(self, tmp_path, capsys):
+        _, rows = _list_rows(extended_keys_file, capsys)
+        assert "default" in rows["plain-key"]
+        assert "default" in rows["future-key"]
+
+    def test_list_shows_expiration(self, extended_keys_file, capsys):
+        """List shows expiration date when configured, and '-' when not."""
+        header, rows = _list_rows(extended_keys_file, capsys)
+        assert "EXPIRES" in header
+        assert "2026-03-01T00:00:00" in rows["full-key"]
+        assert rows["plain-key"].split()[2] == "-"
+
+    def test_list_shows_expired_status(self, extended_keys_file, capsys):
         """List shows 'expired' status for keys past their expiration."""
-        path = tmp_path / "keys.txt"
-        path.write_text("test-key:sk-test-AAAAAAAAAAAAAAAAAAAAAAAAAAAAaaaa::2020-01-01T00:00:00\n")
-        args = argparse.Namespace(file=str(path), quiet=False)
-        key_mgmt.cmd_list(args)
-        captured = capsys.readouterr()
-        assert "expired" in captured.out
+        _, rows = _list_rows(extended_keys_file, capsys)
+        assert rows["past-key"].endswith("expired")
 
-    def test_list_shows_active_status(self, tmp_path, capsys):
-        """List shows 'active' status for non-expired keys."""
-        path = tmp_path / "keys.txt"
-        path.write_text("test-key:sk-test-AAAAAAAAAAAAAAAAAAAAAAAAAAAAaaaa::2099-12-31T23:59:59\n")
-        args = argparse.Namespace(file=str(path), quiet=False)
-        key_mgmt.cmd_list(args)
-        captured = capsys.readouterr()
-        assert "active" in captured.out
+    def test_list_shows_active_status(self, extended_keys_file, capsys):
+        """List shows 'active' status for non-expired keys and keys without expiration."""
+        _, rows = _list_rows(extended_keys_file, capsys)
+        assert rows["future-key"].endswith("active")
+        assert rows["plain-key"].endswith("active")
 
-    def test_list_never_shows_key_values_extended(self, tmp_path, capsys):
+    def test_list_never_shows_key_values_extended(self, extended_keys_file, capsys):
         """List never shows actual API key values even in extended format."""
+        key_mgmt.cmd_list(NS(file=extended_keys_file, quiet=False))
+        captured = capsys.readouterr()
+        assert "sk-test-" not in captured.out
+        assert "5 key(s) configured" in captured.out
+
+    def test_list_columns_widen_to_fit(self, tmp_path, capsys):
+        """Long key_ids and expirations widen their columns so rows stay aligned."""
         path = tmp_path / "keys.txt"
         path.write_text(
-            "test-key:sk-test-AAAAAAAAAAAAAAAAAAAAAAAAAAAAaaaa:120:2026-03-01T00:00:00\n"
+            f"{'k' * 30}:sk-test-AAAA::2099-03-01T00:00:00.123456\n" + "short:sk-test-BBBB:120\n"
         )
-        args = argparse.Namespace(file=str(path), quiet=False)
-        key_mgmt.cmd_list(args)
-        captured = capsys.readouterr()
-        assert "sk-test-AAAA" not in captured.out
+        key_mgmt.cmd_list(NS(file=str(path), quiet=False))
+        header, long_row, short_row = capsys.readouterr().out.splitlines()[:3]
+        assert header.index("RATE_LIMIT") == long_row.index("default") == short_row.index("120")
+        assert header.index("STATUS") == long_row.index("active") == short_row.index("active")
 
 
 # ---------------------------------------------------------------------------
@@ -1057,16 +1080,16 @@ class TestRotateWithExtendedFormat:
         """Rotate preserves the existing per-key rate limit."""
         path = tmp_path / "keys.txt"
         path.write_text("test-key:sk-test-AAAAAAAAAAAAAAAAAAAAAAAAAAAAaaaa:120\n")
-        args = argparse.Namespace(name="test-key", file=str(path), quiet=False, expires=None)
+        args = _mkargs(name="test-key", file=str(path))
         result = key_mgmt.cmd_rotate(args)
         assert result == 0
-        content = open(str(path)).read()
-        key_lines = [ln for ln in content.strip().split("\n") if not ln.startswith("#")]
-        parts = key_lines[0].split(":", 3)
-        assert parts[0] == "test-key"
-        assert parts[1].startswith("sk-")
-        assert parts[1] != "sk-test-AAAAAAAAAAAAAAAAAAAAAAAAAAAAaaaa"  # key changed
-        assert parts[2] == "120"  # rate limit preserved
+        content = path.read_text()
+        key_lines = _key_lines(content)
+        key_id, api_key, rate_limit, _ = key_mgmt.parse_key_line(key_lines[0])
+        assert key_id == "test-key"
+        assert api_key.startswith("sk-")
+        assert api_key != "sk-test-AAAAAAAAAAAAAAAAAAAAAAAAAAAAaaaa"  # key changed
+        assert rate_limit == "120"  # rate limit preserved
 
     def test_rotate_preserves_expiration(self, tmp_path):
         """Rotate preserves existing expiration when --expires is not passed."""
@@ -1074,10 +1097,10 @@ class TestRotateWithExtendedFormat:
         path.write_text(
             "test-key:sk-test-AAAAAAAAAAAAAAAAAAAAAAAAAAAAaaaa:120:2026-12-31T23:59:59\n"
         )
-        args = argparse.Namespace(name="test-key", file=str(path), quiet=False, expires=None)
+        args = _mkargs(name="test-key", file=str(path))
         result = key_mgmt.cmd_rotate(args)
         assert result == 0
-        content = open(str(path)).read()
+        content = path.read_text()
         assert "2026-12-31T23:59:59" in content
         assert "120" in content
 
@@ -1085,15 +1108,10 @@ class TestRotateWithExtendedFormat:
         """Rotate updates expiration when --expires is passed."""
         path = tmp_path / "keys.txt"
         path.write_text("test-key:sk-test-AAAAAAAAAAAAAAAAAAAAAAAAAAAAaaaa::2020-01-01T00:00:00\n")
-        args = argparse.Namespace(
-            name="test-key",
-            file=str(path),
-            quiet=False,
-            expires="2099-12-31T23:59:59",
-        )
+        args = _mkargs(name="test-key", file=str(path), expires="2099-12-31T23:59:59")
         result = key_mgmt.cmd_rotate(args)
         assert result == 0
-        content = open(str(path)).read()
+        content = path.read_text()
         assert "2099-12-31T23:59:59" in content
         assert "2020-01-01T00:00:00" not in content
 
@@ -1101,30 +1119,20 @@ class TestRotateWithExtendedFormat:
         """Rotate accepts relative expiration (30d)."""
         path = tmp_path / "keys.txt"
         path.write_text("test-key:sk-test-AAAAAAAAAAAAAAAAAAAAAAAAAAAAaaaa\n")
-        args = argparse.Namespace(
-            name="test-key",
-            file=str(path),
-            quiet=False,
-            expires="30d",
-        )
+        args = _mkargs(name="test-key", file=str(path), expires="30d")
         result = key_mgmt.cmd_rotate(args)
         assert result == 0
-        content = open(str(path)).read()
+        content = path.read_text()
         # Should now have an expiration field
-        key_lines = [ln for ln in content.strip().split("\n") if not ln.startswith("#")]
-        parts = key_lines[0].split(":", 3)
-        assert len(parts) >= 4  # key_id:api_key::expiration
+        key_lines = _key_lines(content)
+        _, _, _, expiration = key_mgmt.parse_key_line(key_lines[0])
+        assert expiration  # key_id:api_key::expiration
 
     def test_rotate_invalid_expires_fails(self, tmp_path):
         """Rotate rejects invalid expiration format."""
         path = tmp_path / "keys.txt"
         path.write_text("test-key:sk-test-AAAAAAAAAAAAAAAAAAAAAAAAAAAAaaaa\n")
-        args = argparse.Namespace(
-            name="test-key",
-            file=str(path),
-            quiet=False,
-            expires="not-valid",
-        )
+        args = _mkargs(name="test-key", file=str(path), expires="not-valid")
         result = key_mgmt.cmd_rotate(args)
         assert result == 1
 
@@ -1234,36 +1242,10 @@ class TestBuildParserExtended:
 
 
 # ---------------------------------------------------------------------------
-# Coverage gap tests: line 126, lines 260-261, lines 304-306, lines 386-387
+# Coverage gap tests: lines 260-261, lines 304-306, lines 386-387
 # ---------------------------------------------------------------------------
 
 
-class TestParseExpirationUnknownUnit:
-    """Test parse_expiration() with an unknown time unit (line 126).
-
-    Line 126 is defensive dead code: the RELATIVE_TIME_PATTERN regex
-    only matches d, h, m so the else branch is unreachable normally.
-    We exercise it by mocking the regex match to return a fake match
-    with an unrecognized unit character.
-    """
-
-    def test_unknown_time_unit_raises(self):
-        """Unknown time unit raises ValueError via the else branch."""
-
-        class FakeMatch:
-            def group(self, n):
-                if n == 1:
-                    return "30"
-                if n == 2:
-                    return "x"
-                return None
-
-        with patch.object(key_mgmt, "RELATIVE_TIME_PATTERN") as mock_pattern:
-            mock_pattern.match.return_value = FakeMatch()
-            with pytest.raises(ValueError, match="Unknown time unit: x"):
-                key_mgmt.parse_expiration("30x")
-
-
 class TestAtomicWriteReplaceFailure:
     """Test atomic_write() temp file cleanup when os.replace() fails (lines 260-261).
 
@@ -1304,13 +1286,7 @@ class TestGenerateInvalidRateLimitString:
     def test_non_integer_rate_limit_fails(self, tmp_path):
         """Non-integer rate limit string prints error and returns 1."""
         file_path = str(tmp_path / "keys.txt")
-        args = argparse.Namespace(
-            name="test-key",
-            file=file_path,
-            quiet=False,
-            rate_limit="abc",
-            expires=None,
-        )
+        args = _mkargs(name="test-key", file=file_path, rate_limit="abc")
         result = key_mgmt.cmd_generate(args)
         assert result == 1
         # File should not have been created
@@ -1331,7 +1307,7 @@ class TestListInvalidExpirationDate:
         # Write a key line with an invalid expiration that is NOT caught by auth's loader
         # (key_mgmt list reads raw file without auth's validation)
         path.write_text("test-key:sk-test-AAAAAAAAAAAAAAAAAAAAAAAAAAAAaaaa:120:not-a-valid-date\n")
-        args = argparse.Namespace(file=str(path), quiet=False)
+        args = NS(file=str(path), quiet=False)
         result = key_mgmt.cmd_list(args)
         assert result == 0
         captured = capsys.readouterr()